@@ -0,0 +1,97 @@
+"""
+Retry helper shared by the OpenAI scripts in this directory.
+
+Usage:
+from api_retry import retry_on_rate_limit
+
+@retry_on_rate_limit(max_attempts=8)
+def call_api(...):
+    ...
+"""
+
+import functools
+import random
+import time
+from typing import Any, Callable, Optional, Tuple
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+# Same statuses the OpenAI SDK retries on its own; clients wrapped by this
+# decorator are built with max_retries=0, so it has to cover them all
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+def _is_retryable(exc: Exception) -> Tuple[bool, Optional[Any]]:
+    """
+    Decide whether an error is transient.
+
+    Returns:
+        (retryable, response) where response is the HTTP response attached to
+        the error, or None for connection failures and timeouts
+    """
+    if openai is not None:
+        # APITimeoutError subclasses APIConnectionError
+        if isinstance(exc, openai.APIConnectionError):
+            return True, None
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in RETRYABLE_STATUS_CODES, exc.response
+    if requests is not None:
+        if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True, None
+        if isinstance(exc, requests.exceptions.HTTPError):
+            response = exc.response
+            return response is not None and response.status_code in RETRYABLE_STATUS_CODES, response
+    return False, None
+
+def _retry_after_seconds(response: Any) -> Optional[float]:
+    """Read the Retry-After header (in seconds) from a response, if present."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after is None:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        # HTTP-date form is not used by the OpenAI API; fall back to backoff
+        return None
+
+def retry_on_rate_limit(max_attempts: int = 8, base: float = 1.0, cap: float = 60.0) -> Callable:
+    """
+    Retry the decorated call on rate-limit (429), transient server (5xx),
+    408/409, connection and timeout errors.
+
+    Waits use full-jitter exponential backoff, min(cap, base * 2**attempt) * random(),
+    and never less than the server's Retry-After header when one is sent.
+
+    Args:
+        max_attempts: Total number of attempts, including the first one
+        base: Base delay in seconds
+        cap: Upper bound for the backoff delay in seconds
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    retryable, response = _is_retryable(e)
+                    if not retryable or attempt == max_attempts - 1:
+                        raise
+
+                    delay = min(cap, base * 2 ** attempt) * random.random()
+                    retry_after = _retry_after_seconds(response)
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+
+                    print(f"{func.__name__} failed ({e}); retrying in {delay:.1f}s "
+                          f"(attempt {attempt + 2}/{max_attempts})")
+                    time.sleep(delay)
+        return wrapper
+    return decorator
@@ -11,12 +11,27 @@
 # python created_date_filter_openai_messages.py --start "2023-04-01T00:00:00Z" --end "2023-04-30T23:59:59Z" --output filtered_messages.json
 
 import argparse
-import json
 import sys
 from datetime import datetime
 import os
 import requests
 from typing import List, Dict, Any, Optional
+from api_retry import retry_on_rate_limit
+import fast_json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Below this many messages the cost of building the NumPy array outweighs
+# the vectorized comparison, so the plain loop is used instead
+VECTORIZE_MIN_MESSAGES = 1000
 
 def parse_timestamp(timestamp_str: str) -> int:
     """
@@ -27,8 +42,8 @@ def parse_timestamp(timestamp_str: str) -> int:
         # Try parsing as Unix timestamp (integer)
         return int(timestamp_str)
     except ValueError:
-        # Try parsing as ISO 8601 date string
-        dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+        # Try parsing as ISO 8601 date string (fromisoformat accepts a trailing 'Z' on 3.11+)
+        dt = datetime.fromisoformat(timestamp_str)
         return int(dt.timestamp())
 
 def filter_messages(
@@ -40,6 +55,18 @@ def filter_messages(
     Filter messages based on 'created_at' timestamp.
     Returns messages where start_timestamp <= created_at <= end_timestamp.
     """
+    if np is not None and len(messages) >= VECTORIZE_MIN_MESSAGES:
+        created = [m.get("created_at") for m in messages]
+        # Track missing values separately so every real timestamp, including
+        # negative ones, is compared as-is
+        present = np.fromiter((c is not None for c in created), dtype=bool, count=len(created))
+        ts = np.array([0 if c is None else c for c in created])
+        # Only plain int/float arrays compare like the loop below; anything
+        # else (bools, strings, ints beyond int64) takes the loop
+        if ts.dtype.kind in "if":
+            mask = present & (ts >= start_timestamp) & (ts <= end_timestamp)
+            return [messages[i] for i in np.flatnonzero(mask).tolist()]
+
     filtered = []
     
     for message in messages:
@@ -52,9 +79,38 @@ def filter_messages(
             
     return filtered
 
-def get_messages_from_api(api_key: Optional[str] = None) -> List[Dict[str, Any]]:
+def stream_filtered_messages(
+    input_path: str,
+    start_timestamp: int,
+    end_timestamp: int
+) -> List[Dict[str, Any]]:
+    """
+    Stream messages from a JSON file with ijson and keep only those where
+    start_timestamp <= created_at <= end_timestamp.
+    Only the survivors are held in memory, not the whole input file.
+    Handles both {"data": [...]} and direct list formats; the layout is
+    detected from the first non-whitespace byte so the file is parsed once.
+    """
+    with open(input_path, 'rb') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        # A top-level object is only read from its "data" list
+        prefix = 'item' if first == b'[' else 'data.item'
+        return [
+            m for m in ijson.items(f, prefix, use_float=True)
+            if (c := m.get("created_at")) is not None and start_timestamp <= c <= end_timestamp
+        ]
+
+@retry_on_rate_limit(max_attempts=8)
+def get_messages_from_api(
+    api_key: Optional[str] = None,
+    session: Optional[requests.Session] = None
+) -> List[Dict[str, Any]]:
     """
     Fetch messages from OpenAI API.
+    Pass a requests.Session to reuse its connection pool across calls.
     Returns a list of message objects.
     """
     if api_key is None:
@@ -69,10 +125,11 @@ def get_messages_from_api(api_key: Optional[str] = None) -> List[Dict[str, Any]]
     }
     
     # Note: This URL should be updated based on the actual OpenAI messages endpoint
-    response = requests.get("https://api.openai.com/v1/messages", headers=headers)
+    http = session or requests
+    response = http.get("https://api.openai.com/v1/messages", headers=headers, timeout=30)
     response.raise_for_status()
     
-    return response.json().get("data", [])
+    return fast_json.loads(response.content).get("data", [])
 
 def main():
     parser = argparse.ArgumentParser(description="Filter OpenAI messages by timestamp range")
@@ -89,12 +146,17 @@ def main():
     end_timestamp = parse_timestamp(args.end)
     
     # Get messages from file or API
-    if args.input:
+    if args.input and ijson is not None:
+        # Stream the file so peak memory is bounded by the survivors
+        filtered_messages = stream_filtered_messages(args.input, start_timestamp, end_timestamp)
+    elif args.input:
         with open(args.input, 'r') as f:
-            messages = json.load(f)
+            messages = fast_json.loads(f.read())
             # Handle both direct list and {"data": [...]} format
             if isinstance(messages, dict) and "data" in messages:
                 messages = messages["data"]
+        # A single window is one scan; this keeps input order like the other paths
+        filtered_messages = filter_messages(messages, start_timestamp, end_timestamp)
     else:
         # Fetch from API
         try:
@@ -102,19 +164,18 @@ def main():
         except Exception as e:
             print(f"Error fetching messages from API: {e}", file=sys.stderr)
             sys.exit(1)
-    
-    # Filter messages
-    filtered_messages = filter_messages(messages, start_timestamp, end_timestamp)
+        # Filter messages
+        filtered_messages = filter_messages(messages, start_timestamp, end_timestamp)
     
     # Output results
     output_data = {"data": filtered_messages, "count": len(filtered_messages)}
     
     if args.output:
-        with open(args.output, 'w') as f:
-            json.dump(output_data, f, indent=2)
+        with open(args.output, 'wb') as f:
+            f.write(fast_json.dumps(output_data))
         print(f"Filtered {len(filtered_messages)} messages written to {args.output}")
     else:
-        print(json.dumps(output_data, indent=2))
+        print(fast_json.dumps(output_data).decode('utf-8'))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,16 +1,33 @@
 import os
+import argparse
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI, APIError, RateLimitError
-import base64
 from pathlib import Path
+from api_retry import retry_on_rate_limit
+from image_to_text import image_digest, encode_image_for_request, cached_text_path, is_cacheable, write_cached_text
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+@retry_on_rate_limit(max_attempts=8)
+def _create_completion(client, **kwargs):
+    # Retries 429/5xx before extract_id_text's error handling sees them
+    return client.chat.completions.create(**kwargs)
 
 def extract_id_text(client, image_path):
-    # Encode image
-    with open(image_path, "rb") as image_file:
-        base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+    # Reuse the text from a previous run if the image is unchanged
+    cache_file = cached_text_path(image_digest(image_path), "doc_reader")
+    if cache_file.exists():
+        return cache_file.read_text()
+    
+    # Encode image, re-hashing the bytes actually sent
+    mime_type = mimetypes.guess_type(str(image_path))[0] or "image/jpeg"
+    sent_digest, image_url = encode_image_for_request(image_path, mime_type)
     
     # Extract text with GPT-4 Turbo
     try:
-        response = client.chat.completions.create(
+        response = _create_completion(
+            client,
             model="gpt-4-turbo",
             max_tokens=500,
             messages=[{
@@ -31,16 +48,20 @@ Format as plain text with no commentary or analysis. Organize by sections if mul
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}",
+                            "url": image_url,
                             "detail": "high"  # High detail for text extraction
                         }
                     }
                 ]
             }]
         )
-        return response.choices[0].message.content
+        choice = response.choices[0]
+        text = choice.message.content
+        if text and is_cacheable(choice):
+            write_cached_text(cached_text_path(sent_digest, "doc_reader"), text)
+        return text
     except RateLimitError as e:
-        print(f"Rate limit exceeded: {e}. Please wait before retrying.")
+        print(f"Rate limit exceeded after retries: {e}. Please wait before running again.")
         return None
     except APIError as e:
         print(f"API error: {e}")
@@ -50,12 +71,21 @@ Format as plain text with no commentary or analysis. Organize by sections if mul
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description='Extract text from ID images in test_images/')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Number of images to process in parallel (default: 8)')
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error(f"--concurrency must be at least 1, got {args.concurrency}")
+    
     # Init OpenAI client
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is not set")
         
-    client = OpenAI(api_key=api_key)
+    # retry_on_rate_limit handles 429/5xx around every call, so turn off the
+    # SDK's own retries rather than stacking two backoff schedules
+    client = OpenAI(api_key=api_key, max_retries=0)
     
     # Check if test_images directory exists
     image_dir = Path('test_images')
@@ -65,10 +95,10 @@ def main():
         print(f"Please place ID images in the {image_dir} directory and run again")
         return
         
-    # Process all images in directory
-    image_files = list(image_dir.glob('**/*.jpg')) + list(image_dir.glob('**/*.png'))
+    # Process all images in directory (single walk of the tree)
+    image_files = [p for p in image_dir.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file()]
     if not image_files:
-        print(f"No images found in {image_dir} directory. Please add .jpg or .png files.")
+        print(f"No images found in {image_dir} directory. Please add .jpg, .jpeg, .png or .webp files.")
         return
         
     # Create output directory for text files
@@ -76,19 +106,23 @@ def main():
     if not output_dir.exists():
         output_dir.mkdir()
         
-    for image_path in image_files:
-        print(f"\nProcessing {image_path}:")
-        result = extract_id_text(client, image_path)
-        if result:
-            # Write to file
-            output_file = output_dir / f"{image_path.stem}_text.txt"
-            with open(output_file, 'w') as f:
-                f.write(result)
-            print(f"Text extracted and saved to {output_file}")
-            print("\nExtracted text:")
-            print("-" * 50)
-            print(result)
-            print("-" * 50)
+    # Each image is an independent API call, so overlap their latency
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = {executor.submit(extract_id_text, client, p): p for p in image_files}
+        for future in as_completed(futures):
+            image_path = futures[future]
+            print(f"\nProcessed {image_path}:")
+            result = future.result()
+            if result:
+                # Write to file
+                output_file = output_dir / f"{image_path.stem}_text.txt"
+                with open(output_file, 'w') as f:
+                    f.write(result)
+                print(f"Text extracted and saved to {output_file}")
+                print("\nExtracted text:")
+                print("-" * 50)
+                print(result)
+                print("-" * 50)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
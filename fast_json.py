@@ -0,0 +1,34 @@
+"""
+JSON helpers shared by the message filtering scripts in this directory.
+Uses orjson when it is installed and falls back to the stdlib json module.
+
+Usage:
+import fast_json
+
+data = fast_json.loads(response.content)
+with open(path, 'wb') as f:
+    f.write(fast_json.dumps(data))
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize obj as indented JSON.
+    Returns UTF-8 bytes so output files can be written in binary mode.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
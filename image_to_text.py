@@ -2,13 +2,87 @@ import os
 import json
 import argparse
 import base64
+import functools
+import hashlib
+import mimetypes
+import tempfile
+from pathlib import Path
 from openai import OpenAI
+from api_retry import retry_on_rate_limit
 
 def encode_image_to_base64(image_path):
     """Convert an image file to base64 encoding."""
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
+# Read images in chunks that are a multiple of 3 bytes so each chunk
+# base64-encodes without padding and the pieces can simply be concatenated
+B64_CHUNK_SIZE = 3 * 65536
+
+def _iter_image_chunks(image_path, chunk_size=B64_CHUNK_SIZE):
+    """Yield an image file's bytes in fixed-size chunks."""
+    with open(image_path, "rb") as image_file:
+        while chunk := image_file.read(chunk_size):
+            yield chunk
+
+def image_digest(image_path):
+    """Return the SHA-256 hex digest of an image file, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in _iter_image_chunks(image_path):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def encode_image_for_request(image_path, mime_type="image/jpeg"):
+    """
+    Base64-encode an image into a data URL and SHA-256 it in the same pass
+    over the file, so the returned digest describes exactly the bytes sent.
+    The raw image is read in chunks and is never held whole next to its
+    encoding; the base64 buffer itself still holds the full payload.
+    
+    Returns:
+        (digest, data_url)
+    """
+    digest = hashlib.sha256()
+    data_url = bytearray(f"data:{mime_type};base64,".encode('ascii'))
+    for chunk in _iter_image_chunks(image_path):
+        digest.update(chunk)
+        data_url += base64.b64encode(chunk)
+    return digest.hexdigest(), data_url.decode('ascii')
+
+# Extracted text is cached by SHA-256 of the image bytes so unchanged images
+# are not sent to the API again on later runs
+CACHE_DIR = Path('extracted_text') / '.cache'
+
+def cached_text_path(digest, namespace):
+    """
+    Return the cache file for an image's extracted text, given its SHA-256 hex digest.
+    The namespace keeps results from different prompts apart.
+    """
+    return CACHE_DIR / namespace / f"{digest}.txt"
+
+def is_cacheable(choice):
+    """
+    Only cache complete answers: not replies cut off at max_tokens,
+    content-filtered, or refused by the model.
+    """
+    return choice.finish_reason == "stop" and not getattr(choice.message, "refusal", None)
+
+def write_cached_text(cache_file, text):
+    """Atomically write extracted text to the cache."""
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=cache_file.parent, suffix='.tmp', delete=False) as tmp:
+        tmp.write(text)
+    os.replace(tmp.name, cache_file)
+
+@functools.lru_cache(maxsize=4)
+def _client(api_key: str) -> OpenAI:
+    """
+    Return a shared OpenAI client per API key, so its HTTP/TLS setup happens once.
+    SDK retries are off because extract_text_from_image is wrapped in retry_on_rate_limit.
+    """
+    return OpenAI(api_key=api_key, max_retries=0)
+
+@retry_on_rate_limit(max_attempts=8)
 def extract_text_from_image(image_path, api_key=None):
     """
     Extract text from an image using OpenAI's Vision capabilities.
@@ -20,12 +94,17 @@ def extract_text_from_image(image_path, api_key=None):
         if api_key is None:
             raise ValueError("OpenAI API key must be provided or set as OPENAI_API_KEY environment variable")
     
-    client = OpenAI(api_key=api_key)
+    # Skip the API call entirely if this exact image was already processed;
+    # hashing is cheap, so only encode on a cache miss
+    cache_file = cached_text_path(image_digest(image_path), "image_to_text")
+    if cache_file.exists():
+        return cache_file.read_text()
     
-    # Encode the image
-    base64_image = encode_image_to_base64(image_path)
-
-    #print(base64_image)
+    client = _client(api_key)
+    
+    # Encode the image, re-hashing the bytes actually sent
+    mime_type = mimetypes.guess_type(str(image_path))[0] or "image/jpeg"
+    sent_digest, image_url = encode_image_for_request(image_path, mime_type)
     
     # First: Extract text from the image
     text_extraction_response = client.chat.completions.create(
@@ -38,7 +117,7 @@ def extract_text_from_image(image_path, api_key=None):
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}",
+                            "url": image_url,
                             "detail": "high"
                         }
                     }
@@ -48,7 +127,10 @@ def extract_text_from_image(image_path, api_key=None):
         max_tokens=1000
     )
     
-    extracted_text = text_extraction_response.choices[0].message.content
+    choice = text_extraction_response.choices[0]
+    extracted_text = choice.message.content
+    if extracted_text and is_cacheable(choice):
+        write_cached_text(cached_text_path(sent_digest, "image_to_text"), extracted_text)
     result = extracted_text
     # Second: Process the extracted text into key-value pairs
     # kv_response = client.chat.completions.create(
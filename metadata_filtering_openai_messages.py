@@ -6,11 +6,25 @@ python metadata_filtering_openai_messages.py thread_123456 --limit 50 --output m
 """
 
 import requests
-import json
 import os
+import re
+import time
 from datetime import datetime
 import argparse
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+from api_retry import retry_on_rate_limit
+import fast_json
+
+def _parse_reset_duration(value: str) -> float:
+    """
+    Parse an OpenAI rate-limit reset duration such as '1s', '6m0s' or '120ms'
+    into seconds. Returns 1.0 if the value cannot be parsed.
+    """
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    matches = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value or "")
+    if not matches:
+        return 1.0
+    return sum(float(amount) * units[unit] for amount, unit in matches)
 
 class OpenAIMessageClient:
     """Client for retrieving OpenAI messages based on metadata filters."""
@@ -31,6 +45,20 @@ class OpenAIMessageClient:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        
+        # Reuse one connection pool across calls to avoid a TCP+TLS handshake per request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+    
+    def close(self):
+        """Close the underlying HTTP session."""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def get_messages(self, 
                     thread_id: str,
@@ -43,56 +71,117 @@ class OpenAIMessageClient:
         Args:
             thread_id: The ID of the thread to retrieve messages from
             metadata_filters: Dict of metadata key-value pairs to filter by
-            limit: Maximum number of messages to return (1-100)
+            limit: Maximum number of matching messages to return; pages through the thread beyond 100
             order: Sort order - "asc" or "desc" (default) by creation time
             
         Returns:
-            List of message objects matching the criteria
+            List of message objects matching the criteria. If a later page fails,
+            the messages from the pages fetched before it are returned.
         """
         url = f"{self.base_url}/threads/{thread_id}/messages"
+        limit = max(1, limit)
         
+        # The messages endpoint has no metadata query parameters, so filtering
+        # happens client-side; with filters, fetch full pages since many may be dropped
         params = {
-            "limit": min(100, max(1, limit)),  # Ensure limit is between 1-100
+            "limit": 100 if metadata_filters else min(100, limit),
             "order": order
         }
+        filter_items = tuple(metadata_filters.items()) if metadata_filters else ()
         
+        messages = []
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            messages = data.get("data", [])
-            
-            # Filter by metadata if specified
-            if metadata_filters:
-                filtered_messages = []
-                for message in messages:
-                    message_metadata = message.get("metadata", {})
-                    if self._matches_metadata_filters(message_metadata, metadata_filters):
-                        filtered_messages.append(message)
-                return filtered_messages
+            while len(messages) < limit:
+                response = self._get_page(url, params)
+                
+                data = fast_json.loads(response.content)
+                page = data.get("data", [])
+                
+                # Filter by metadata if specified
+                if filter_items:
+                    for message in page:
+                        if self._matches_metadata_filters(message.get("metadata", {}), filter_items):
+                            messages.append(message)
+                            # Stop as soon as enough matches are collected,
+                            # without touching the cursor or rate-limit pause
+                            if len(messages) >= limit:
+                                return messages
+                else:
+                    messages.extend(page)
+                
+                # Follow the cursor until enough messages are collected or the
+                # thread is exhausted; only then is another request (and a
+                # possible rate-limit pause) needed
+                if len(messages) >= limit or not data.get("has_more") or not page:
+                    break
+                params["after"] = page[-1]["id"]
+                if not filter_items:
+                    # Only ask for what is still missing
+                    params["limit"] = min(100, limit - len(messages))
+                self._respect_rate_limit(response.headers)
             
-            return messages
+            return messages[:limit]
             
         except requests.exceptions.RequestException as e:
             print(f"Error retrieving messages: {e}")
-            if hasattr(e, 'response') and e.response:
+            if getattr(e, 'response', None) is not None:
                 print(f"Response status: {e.response.status_code}")
                 print(f"Response body: {e.response.text}")
-            return []
+            # Keep the pages that were already fetched rather than discarding them
+            if messages:
+                print(f"Returning the {len(messages)} messages retrieved before the error")
+            return messages[:limit]
     
-    def _matches_metadata_filters(self, message_metadata: Dict, filters: Dict) -> bool:
+    @retry_on_rate_limit(max_attempts=8)
+    def _get_page(self, url: str, params: Dict[str, Any]) -> requests.Response:
+        """
+        Fetch one page of messages, retrying on rate limits and 5xx errors.
+        
+        Args:
+            url: Messages endpoint for the thread
+            params: Query parameters for this page
+            
+        Returns:
+            The successful HTTP response
+        """
+        response = self.session.get(url, params=params, timeout=30)
+        response.raise_for_status()
+        return response
+    
+    def _respect_rate_limit(self, headers: Dict[str, str]) -> None:
+        """
+        Pause until the request window resets when fewer than 10% of the
+        allowed requests remain, based on OpenAI's x-ratelimit-* headers.
+        
+        Args:
+            headers: Response headers from the last API call
+        """
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        total = headers.get("x-ratelimit-limit-requests")
+        if remaining is None or total is None:
+            return
+        try:
+            if int(remaining) >= 0.1 * int(total):
+                return
+        except ValueError:
+            return
+        
+        wait = _parse_reset_duration(headers.get("x-ratelimit-reset-requests", "1s"))
+        print(f"Approaching rate limit ({remaining}/{total} requests left), pausing {wait:.1f}s")
+        time.sleep(wait)
+    
+    def _matches_metadata_filters(self, message_metadata: Dict, filter_items: Tuple[Tuple[str, Any], ...]) -> bool:
         """
         Check if message metadata matches all specified filters.
         
         Args:
             message_metadata: Metadata dict from the message
-            filters: Dict of metadata key-value pairs to match
+            filter_items: Metadata (key, value) pairs to match, precomputed once per query
             
         Returns:
             True if all filters match, False otherwise
         """
-        for key, value in filters.items():
+        for key, value in filter_items:
             if key not in message_metadata or message_metadata[key] != value:
                 return False
         return True
@@ -114,8 +203,8 @@ class OpenAIMessageClient:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_file = f"openai_messages_{timestamp}.json"
         
-        with open(output_file, 'w') as f:
-            json.dump(messages, f, indent=2)
+        with open(output_file, 'wb') as f:
+            f.write(fast_json.dumps(messages))
         
         print(f"Exported {len(messages)} messages to {output_file}")
         return output_file
@@ -133,27 +222,31 @@ def main():
     
     # Parse metadata filters
     metadata_filters = {}
-    if args.metadata:
-        for filter_str in args.metadata:
-            if "=" in filter_str:
-                key, value = filter_str.split("=", 1)
-                metadata_filters[key.strip()] = value.strip()
+    malformed = []
+    for filter_str in args.metadata or ():
+        key, sep, value = filter_str.partition("=")
+        if sep:
+            metadata_filters[key.strip()] = value.strip()
+        else:
+            malformed.append(filter_str)
+    if malformed:
+        parser.error(f"--metadata filters must be in key=value format, got: {', '.join(malformed)}")
     
     # Initialize client and get messages
     try:
-        client = OpenAIMessageClient(args.api_key)
-        messages = client.get_messages(
-            thread_id=args.thread_id,
-            metadata_filters=metadata_filters,
-            limit=args.limit,
-            order=args.order
-        )
-        
-        if messages:
-            client.export_messages_to_json(messages, args.output)
-            print(f"Successfully retrieved {len(messages)} messages")
-        else:
-            print("No messages found matching the criteria")
+        with OpenAIMessageClient(args.api_key) as client:
+            messages = client.get_messages(
+                thread_id=args.thread_id,
+                metadata_filters=metadata_filters,
+                limit=args.limit,
+                order=args.order
+            )
+            
+            if messages:
+                client.export_messages_to_json(messages, args.output)
+                print(f"Successfully retrieved {len(messages)} messages")
+            else:
+                print("No messages found matching the criteria")
             
     except Exception as e:
         print(f"Error: {e}")
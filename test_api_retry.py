@@ -0,0 +1,104 @@
+# Usage:
+# pytest test_api_retry.py -v
+
+import pytest
+import openai
+import requests
+from unittest import mock
+
+import api_retry
+from api_retry import retry_on_rate_limit
+
+def make_http_error(status_code: int, headers=None) -> requests.exceptions.HTTPError:
+    """Build a requests HTTPError carrying a response with the given status"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return requests.exceptions.HTTPError(f"{status_code} error", response=response)
+
+class FlakyCall:
+    """Callable that raises the queued errors in order, then returns 'ok'"""
+
+    __name__ = "flaky_call"
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+class TestRetryOnRateLimit:
+    """Test suite for the retry_on_rate_limit decorator"""
+
+    @pytest.fixture(autouse=True)
+    def sleeps(self, monkeypatch):
+        """Record backoff delays instead of sleeping"""
+        delays = []
+        monkeypatch.setattr(api_retry.time, "sleep", delays.append)
+        monkeypatch.setattr(api_retry.random, "random", lambda: 1.0)
+        return delays
+
+    def test_retries_429_then_succeeds(self, sleeps):
+        """Test that a rate-limited call is retried until it succeeds"""
+        call = FlakyCall(make_http_error(429))
+        assert retry_on_rate_limit(max_attempts=3, base=0.5)(call)() == "ok"
+        assert call.calls == 2
+        assert sleeps == [0.5]
+
+    def test_honors_retry_after(self, sleeps):
+        """Test that Retry-After is used when it exceeds the backoff delay"""
+        call = FlakyCall(make_http_error(429, {"Retry-After": "7"}))
+        retry_on_rate_limit(max_attempts=3, base=0.5)(call)()
+        assert sleeps == [7.0]
+
+    def test_no_retry_on_400(self, sleeps):
+        """Test that client errors are raised immediately"""
+        call = FlakyCall(make_http_error(400))
+        with pytest.raises(requests.exceptions.HTTPError):
+            retry_on_rate_limit(max_attempts=3)(call)()
+        assert call.calls == 1
+        assert sleeps == []
+
+    def test_reraises_on_last_attempt(self, sleeps):
+        """Test that the last error propagates once attempts run out"""
+        call = FlakyCall(*(make_http_error(503) for _ in range(3)))
+        with pytest.raises(requests.exceptions.HTTPError):
+            retry_on_rate_limit(max_attempts=3, base=1.0)(call)()
+        assert call.calls == 3
+        assert sleeps == [1.0, 2.0]
+
+    def test_backoff_capped(self, sleeps):
+        """Test that the exponential delay never exceeds the cap"""
+        call = FlakyCall(*(make_http_error(500) for _ in range(4)))
+        retry_on_rate_limit(max_attempts=5, base=1.0, cap=3.0)(call)()
+        assert sleeps == [1.0, 2.0, 3.0, 3.0]
+
+    @pytest.mark.parametrize("error", [
+        requests.exceptions.ConnectionError("connection dropped"),
+        requests.exceptions.Timeout("read timed out"),
+        openai.APIConnectionError(request=mock.Mock()),
+        openai.APITimeoutError(request=mock.Mock()),
+    ])
+    def test_retries_connection_errors(self, error, sleeps):
+        """Test that connection failures and timeouts are retried"""
+        call = FlakyCall(error)
+        assert retry_on_rate_limit(max_attempts=2)(call)() == "ok"
+        assert call.calls == 2
+
+    def test_retries_openai_rate_limit_error(self, sleeps):
+        """Test that the SDK's RateLimitError is retried and its Retry-After honored"""
+        response = mock.Mock(status_code=429, headers={"Retry-After": "4"})
+        call = FlakyCall(openai.RateLimitError("rate limited", response=response, body=None))
+        assert retry_on_rate_limit(max_attempts=2, base=0.5)(call)() == "ok"
+        assert sleeps == [4.0]
+
+    def test_other_exceptions_not_retried(self, sleeps):
+        """Test that unrelated exceptions pass straight through"""
+        call = FlakyCall(ValueError("bad input"))
+        with pytest.raises(ValueError):
+            retry_on_rate_limit(max_attempts=3)(call)()
+        assert call.calls == 1
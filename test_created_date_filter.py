@@ -0,0 +1,66 @@
+# Usage:
+# pytest test_created_date_filter.py -v
+
+import json
+import random
+import pytest
+
+import created_date_filter_openai_messages as cdf
+from created_date_filter_openai_messages import filter_messages, stream_filtered_messages
+
+MESSAGES = [
+    {"id": "msg_c", "created_at": 30},
+    {"id": "msg_a", "created_at": 10},
+    {"id": "msg_none"},
+    {"id": "msg_b", "created_at": 20},
+]
+
+class TestStreamFilteredMessages:
+    """Test suite for streaming --input files with ijson"""
+
+    @pytest.fixture(autouse=True)
+    def require_ijson(self):
+        pytest.importorskip("ijson")
+
+    @pytest.mark.parametrize("payload", [
+        {"data": MESSAGES},
+        MESSAGES,
+    ])
+    def test_both_layouts_keep_input_order(self, tmp_path, payload):
+        """Test that wrapped and plain-list files give the same survivors in file order"""
+        path = tmp_path / "messages.json"
+        path.write_text("\n  " + json.dumps(payload))
+        result = stream_filtered_messages(str(path), 15, 30)
+        assert [m["id"] for m in result] == ["msg_c", "msg_b"]
+
+    def test_object_without_data_is_empty(self, tmp_path):
+        """Test that an object without a "data" list yields no messages"""
+        path = tmp_path / "messages.json"
+        path.write_text(json.dumps({"object": "list"}))
+        assert stream_filtered_messages(str(path), 0, 100) == []
+
+class TestFilterMessages:
+    """Test suite for filter_messages"""
+
+    @pytest.fixture
+    def many_messages(self):
+        """Enough messages to take the NumPy path, with awkward created_at values"""
+        rng = random.Random(0)
+        values = [-50, -1, 0, 10, 10.7, 9.5, 100, None]
+        messages = [{"id": f"msg_{i}", "created_at": rng.choice(values + [rng.randint(-200, 200)])}
+                    for i in range(cdf.VECTORIZE_MIN_MESSAGES + 500)]
+        messages[::7] = [{"id": f"missing_{i}"} for i in range(len(messages[::7]))]
+        return messages
+
+    @pytest.mark.parametrize("window", [(-100, 10), (0, 10), (10, 10), (-1, -1), (9.5, 100)])
+    def test_numpy_path_matches_loop(self, many_messages, window, monkeypatch):
+        """Test that the vectorized path returns exactly what the scalar loop returns"""
+        pytest.importorskip("numpy")
+        vectorized = filter_messages(many_messages, *window)
+        monkeypatch.setattr(cdf, "np", None)
+        assert vectorized == filter_messages(many_messages, *window)
+
+    def test_keeps_input_order(self):
+        """Test that survivors come back in input order"""
+        result = filter_messages(MESSAGES, 0, 100)
+        assert [m["id"] for m in result] == ["msg_c", "msg_a", "msg_b"]
@@ -0,0 +1,59 @@
+# Usage:
+# pytest test_image_cache.py -v
+
+import pytest
+from unittest import mock
+
+import doc_reader
+import image_to_text
+
+def make_completion(content, finish_reason="stop", refusal=None):
+    """Build a minimal stand-in for a chat completion response"""
+    message = mock.Mock(content=content, refusal=refusal)
+    return mock.Mock(choices=[mock.Mock(message=message, finish_reason=finish_reason)])
+
+class TestExtractedTextCache:
+    """Test suite for the content-hash cache used by doc_reader and image_to_text"""
+
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path, monkeypatch):
+        """Point the cache at a temporary directory"""
+        monkeypatch.setattr(image_to_text, "CACHE_DIR", tmp_path / ".cache")
+        return tmp_path / ".cache"
+
+    @pytest.fixture
+    def image_path(self, tmp_path):
+        path = tmp_path / "id.png"
+        path.write_bytes(b"\x89PNG fake image bytes")
+        return path
+
+    def test_complete_answer_is_cached(self, image_path):
+        """Test that a finished answer is reused without calling the API again"""
+        client = mock.Mock()
+        client.chat.completions.create.return_value = make_completion("Name: Jane Doe")
+        assert doc_reader.extract_id_text(client, image_path) == "Name: Jane Doe"
+
+        with mock.patch.object(doc_reader, "encode_image_for_request") as encode:
+            assert doc_reader.extract_id_text(client, image_path) == "Name: Jane Doe"
+            encode.assert_not_called()
+        assert client.chat.completions.create.call_count == 1
+
+    @pytest.mark.parametrize("completion", [
+        make_completion("Name: Jane", finish_reason="length"),
+        make_completion("", finish_reason="content_filter"),
+        make_completion(None, refusal="I can't help with that."),
+    ])
+    def test_incomplete_answer_not_cached(self, image_path, cache_dir, completion):
+        """Test that truncated, filtered or refused replies are not cached"""
+        client = mock.Mock()
+        client.chat.completions.create.return_value = completion
+        doc_reader.extract_id_text(client, image_path)
+        assert not list(cache_dir.rglob("*.txt"))
+
+    def test_sends_mime_type_of_extension(self, image_path):
+        """Test that a PNG is sent as image/png rather than image/jpeg"""
+        client = mock.Mock()
+        client.chat.completions.create.return_value = make_completion("text")
+        doc_reader.extract_id_text(client, image_path)
+        content = client.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+        assert content[1]["image_url"]["url"].startswith("data:image/png;base64,")
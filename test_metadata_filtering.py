@@ -0,0 +1,139 @@
+# Usage:
+# pytest test_metadata_filtering.py -v
+
+import json
+import pytest
+import requests
+
+import api_retry
+import metadata_filtering_openai_messages as mf
+from metadata_filtering_openai_messages import OpenAIMessageClient, _parse_reset_duration
+
+def make_response(messages, has_more, status_code=200, headers=None):
+    """Build a requests Response carrying one page of messages"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = json.dumps({"data": messages, "has_more": has_more}).encode()
+    return response
+
+def make_messages(start, count, metadata=None):
+    return [{"id": f"msg_{i}", "metadata": metadata or {}} for i in range(start, start + count)]
+
+class FakeSession:
+    """Session stand-in that serves queued responses and records request params"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.params = []
+
+    def get(self, url, params=None, timeout=None):
+        self.params.append(dict(params))
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+class TestGetMessages:
+    """Test suite for OpenAIMessageClient.get_messages pagination"""
+
+    @pytest.fixture(autouse=True)
+    def sleeps(self, monkeypatch):
+        """Record rate-limit and backoff pauses instead of sleeping"""
+        delays = []
+        monkeypatch.setattr(mf.time, "sleep", delays.append)
+        monkeypatch.setattr(api_retry.time, "sleep", delays.append)
+        return delays
+
+    def make_client(self, *responses):
+        client = OpenAIMessageClient(api_key="sk-test")
+        client.session = FakeSession(*responses)
+        return client
+
+    def test_follows_cursor_until_has_more_is_false(self):
+        """Test that pages are chained with 'after' and stop when has_more is false"""
+        client = self.make_client(
+            make_response(make_messages(0, 100), has_more=True),
+            make_response(make_messages(100, 30), has_more=False),
+        )
+        messages = client.get_messages("thread_1", limit=500)
+        assert len(messages) == 130
+        assert "after" not in client.session.params[0]
+        assert client.session.params[1]["after"] == "msg_99"
+
+    def test_follow_up_page_asks_only_for_remaining(self):
+        """Test that the next page's limit is what is still needed"""
+        client = self.make_client(
+            make_response(make_messages(0, 100), has_more=True),
+            make_response(make_messages(100, 20), has_more=True),
+        )
+        messages = client.get_messages("thread_1", limit=120)
+        assert len(messages) == 120
+        assert [p["limit"] for p in client.session.params] == [100, 20]
+
+    def test_stops_without_pausing_once_limit_reached(self, sleeps):
+        """Test that a full result does not trigger another request or a rate-limit pause"""
+        headers = {
+            "x-ratelimit-remaining-requests": "1",
+            "x-ratelimit-limit-requests": "100",
+            "x-ratelimit-reset-requests": "6m0s",
+        }
+        client = self.make_client(make_response(make_messages(0, 100), has_more=True, headers=headers))
+        assert len(client.get_messages("thread_1", limit=100)) == 100
+        assert len(client.session.params) == 1
+        assert sleeps == []
+
+    def test_metadata_filter_stops_early(self, sleeps):
+        """Test that filtering stops paging as soon as enough matches are found"""
+        page = make_messages(0, 10, {"user": "a"}) + make_messages(10, 90, {"user": "b"})
+        client = self.make_client(make_response(page, has_more=True))
+        messages = client.get_messages("thread_1", metadata_filters={"user": "a"}, limit=5)
+        assert [m["id"] for m in messages] == [f"msg_{i}" for i in range(5)]
+        assert len(client.session.params) == 1
+        assert sleeps == []
+
+    def test_metadata_filter_pages_through_non_matches(self):
+        """Test that filtering keeps fetching full pages until matches are found"""
+        client = self.make_client(
+            make_response(make_messages(0, 100, {"user": "b"}), has_more=True),
+            make_response(make_messages(100, 3, {"user": "a"}), has_more=False),
+        )
+        messages = client.get_messages("thread_1", metadata_filters={"user": "a"}, limit=50)
+        assert [m["id"] for m in messages] == ["msg_100", "msg_101", "msg_102"]
+        assert [p["limit"] for p in client.session.params] == [100, 100]
+
+    def test_error_on_later_page_keeps_fetched_messages(self):
+        """Test that a failing page does not discard the pages already fetched"""
+        client = self.make_client(
+            make_response(make_messages(0, 100), has_more=True),
+            make_response([], has_more=False, status_code=404),
+        )
+        messages = client.get_messages("thread_1", limit=300)
+        assert len(messages) == 100
+
+    def test_pauses_when_rate_limit_low(self, sleeps):
+        """Test that the client waits for the reset window before the next page"""
+        headers = {
+            "x-ratelimit-remaining-requests": "5",
+            "x-ratelimit-limit-requests": "100",
+            "x-ratelimit-reset-requests": "1.5s",
+        }
+        client = self.make_client(
+            make_response(make_messages(0, 100), has_more=True, headers=headers),
+            make_response(make_messages(100, 1), has_more=False),
+        )
+        client.get_messages("thread_1", limit=200)
+        assert sleeps == [1.5]
+
+@pytest.mark.parametrize("value, seconds", [
+    ("1s", 1.0),
+    ("6m0s", 360.0),
+    ("120ms", 0.12),
+    ("1m30.5s", 90.5),
+    ("1h2m", 3720.0),
+    ("", 1.0),
+    ("soon", 1.0),
+])
+def test_parse_reset_duration(value, seconds):
+    """Test parsing of OpenAI x-ratelimit-reset-* durations"""
+    assert _parse_reset_duration(value) == pytest.approx(seconds)
@@ -4,8 +4,8 @@
 import pytest
 import os
 import openai
-import json
 import re
+import time
 from typing import Dict, List, Any, Optional
 
 # Mock response for testing without making actual API calls
@@ -31,6 +31,9 @@ MOCK_COMPLETION_RESPONSE = {
     }
 }
 
+# Forbidden words checked in generated content, compiled once for all tests
+_FORBIDDEN = re.compile(r'(badword1|badword2)', re.IGNORECASE)
+
 # Configure with your API key for actual API calls
 # openai.api_key = os.environ.get("OPENAI_API_KEY")
 
@@ -80,7 +83,7 @@ class TestOpenAIResponse:
         # Example constraints - modify based on your needs
         assert len(content) >= 5  # Min length
         assert len(content) <= 1000  # Max length
-        assert not re.search(r'(badword1|badword2)', content, re.IGNORECASE)  # No forbidden words
+        assert not _FORBIDDEN.search(content)  # No forbidden words
     
     @pytest.mark.parametrize("temperature", [0.0, 0.5, 1.0])
     def test_live_api_temperature(self, temperature):
@@ -96,7 +99,7 @@ class TestOpenAIResponse:
         )
         
         # Convert response object to dict for testing
-        response_dict = json.loads(response.model_dump_json())
+        response_dict = response.model_dump()
         
         # Basic validation
         assert response_dict["choices"][0]["message"]["content"]
@@ -108,18 +111,16 @@ class TestOpenAIResponse:
         """Test that the API responds within an acceptable time range"""
         pytest.skip("Skip live API tests by default - remove this line to enable")
         
-        import time
         client = openai.OpenAI()
         
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": "Quick test"}],
         )
-        end_time = time.time()
+        elapsed_ns = time.perf_counter_ns() - start_ns
         
-        response_time = end_time - start_time
-        assert response_time < 10  # Response should be under 10 seconds
+        assert elapsed_ns < 10_000_000_000  # Response should be under 10 seconds
     
     def test_custom_parameters(self, mock_response, custom_param=None):
         """Template for testing custom parameters"""
@@ -151,7 +152,7 @@ def make_actual_api_call(prompt: str, **kwargs) -> Dict[str, Any]:
     )
     
     # Convert response object to dict
-    return json.loads(response.model_dump_json())
+    return response.model_dump()
 
 if __name__ == "__main__":
     pytest.main(["-v"])
\ No newline at end of file
@@ -1,9 +1,12 @@
 import openai
 import os
 import time
+from api_retry import retry_on_rate_limit
 
 # Replace with your API key
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# SDK retries are disabled: calls through this client are wrapped in
+# retry_on_rate_limit, which would otherwise multiply the SDK's own attempts
+client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
 def create_assistant():
     """Create a new assistant"""
@@ -37,30 +40,41 @@ def run_assistant(thread_id, assistant_id):
     )
     return run
 
-def wait_for_run_completion(thread_id, run_id):
-    """Wait for a run to complete"""
+@retry_on_rate_limit(max_attempts=8)
+def retrieve_run(thread_id, run_id):
+    """Retrieve the current state of a run"""
+    return client.beta.threads.runs.retrieve(
+        thread_id=thread_id,
+        run_id=run_id
+    )
+
+def wait_for_run_completion(thread_id, run_id, initial_delay=0.2, max_delay=5.0):
+    """Wait for a run to complete, polling quickly at first and backing off up to max_delay"""
+    delay = initial_delay
     while True:
-        run = openai.beta.threads.runs.retrieve(
-            thread_id=thread_id,
-            run_id=run_id
-        )
+        run = retrieve_run(thread_id, run_id)
         if run.status == "completed":
             return run
         elif run.status in ["failed", "cancelled", "expired"]:
             raise Exception(f"Run ended with status: {run.status}")
         
         print(f"Waiting for run to complete. Current status: {run.status}")
-        time.sleep(2)
-
-def get_messages(thread_id):
-    """Get messages from a thread"""
-    messages = openai.beta.threads.messages.list(
-        thread_id=thread_id
+        time.sleep(delay)
+        delay = min(delay * 1.5, max_delay)
+
+@retry_on_rate_limit(max_attempts=8)
+def get_messages(thread_id, after=None):
+    """Get messages from a thread oldest first, optionally only those newer than the message ID `after`"""
+    cursor = {"after": after} if after else {}
+    messages = client.beta.threads.messages.list(
+        thread_id=thread_id,
+        order="asc",
+        **cursor
     )
     return messages
 
 def display_message_data(messages):
-    for message in reversed(list(messages.data)):
+    for message in messages.data:
         role = message.role
         content = message.content[0].text.value if hasattr(message.content[0], 'text') else str(message.content[0])
         print(f"{role.upper()}: {content}")
@@ -74,62 +88,34 @@ def main():
     thread = create_thread()
     print(f"Created thread with ID: {thread.id}")
 
-    # Add a message to the thread
-    message_content = "How long is a US passport valid for?"
-    add_message_to_thread(thread.id, message_content)
-    print(f"Added message to thread: '{message_content}'")
-
-    # Run the assistant on the thread
-    run = run_assistant(thread.id, assistant.id)
-    print(f"Started run with ID: {run.id}")
-
-    # Wait for the run to complete
-    run = wait_for_run_completion(thread.id, run.id)
-    print(f"Run completed with status: {run.status}")
-
-    # Get messages
-    messages = get_messages(thread.id)
-    print("\nConversation:")
-    
-    display_message_data(messages)
-
-    # Add a message to the thread
-    message_content = "I live in Lexington, MA.  Where can I go to get my passport renewed?"
-    add_message_to_thread(thread.id, message_content)
-    print(f"Added message to thread: '{message_content}'")
-
-    # Run the assistant on the thread
-    run = run_assistant(thread.id, assistant.id)
-    print(f"Started run with ID: {run.id}")
-
-    # Wait for the run to complete
-    run = wait_for_run_completion(thread.id, run.id)
-    print(f"Run completed with status: {run.status}")
-
-    # Get messages
-    messages = get_messages(thread.id)
-    print("\nConversation:")
-    
-    display_message_data(messages)
-
-    # Add a message to the thread
-    message_content = "I am a US citizen.  How much does it cost to renew my passport?"
-    add_message_to_thread(thread.id, message_content)
-    print(f"Added message to thread: '{message_content}'")
-
-    # Run the assistant on the thread
-    run = run_assistant(thread.id, assistant.id)
-    print(f"Started run with ID: {run.id}")
-
-    # Wait for the run to complete
-    run = wait_for_run_completion(thread.id, run.id)
-    print(f"Run completed with status: {run.status}")
-
-    # Get messages
-    messages = get_messages(thread.id)
-    print("\nConversation:")
-    
-    display_message_data(messages)
+    questions = [
+        "How long is a US passport valid for?",
+        "I live in Lexington, MA.  Where can I go to get my passport renewed?",
+        "I am a US citizen.  How much does it cost to renew my passport?",
+    ]
+
+    # ID of the newest message shown so far; later turns only fetch what is new
+    last_id = None
+    for message_content in questions:
+        # Add a message to the thread
+        add_message_to_thread(thread.id, message_content)
+        print(f"Added message to thread: '{message_content}'")
+
+        # Run the assistant on the thread
+        run = run_assistant(thread.id, assistant.id)
+        print(f"Started run with ID: {run.id}")
+
+        # Wait for the run to complete
+        run = wait_for_run_completion(thread.id, run.id)
+        print(f"Run completed with status: {run.status}")
+
+        # Get messages added since the last turn
+        messages = get_messages(thread.id, after=last_id)
+        print("\nConversation:")
+
+        display_message_data(messages)
+        if messages.data:
+            last_id = messages.data[-1].id
 
 if __name__ == "__main__":
     main()